@@ -6,12 +6,23 @@ import csv
 import json
 import logging
 import os
+import signal
 import sys
+import threading
 from collections.abc import Iterable
 from pathlib import Path
 from typing import Any
 
-from camtrace.enrich_adapter import enrich_flow_record
+from camtrace import profiling
+from camtrace.enrich_adapter import (
+    META_KEY,
+    RefreshPolicy,
+    enrich_flow_batch,
+    enrich_flow_record,
+)
+from camtrace.follow import FollowReader
+from camtrace.inventory import INVENTORY_DB_PATH, INVENTORY_FIELDS, DeviceInventory
+from camtrace.ip_enricher import ENRICH_FIELDS
 
 # Optional: load .env only in dev when explicitly requested
 if os.getenv("CAMTRACE_USE_DOTENV") == "1":
@@ -24,6 +35,29 @@ if os.getenv("CAMTRACE_USE_DOTENV") == "1":
 
 
 # ----------------- CLI args -----------------
+def _parse_fields(value: str) -> list[str]:
+    fields = list(dict.fromkeys(f.strip() for f in value.split(",") if f.strip()))
+    if not fields:
+        raise argparse.ArgumentTypeError("--fields needs at least one column name")
+    valid = CSV_COLUMNS + INVENTORY_COLUMNS + META_COLUMNS
+    unknown = [f for f in fields if f not in valid]
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"unknown column(s) {', '.join(unknown)}; valid columns: {', '.join(valid)}"
+        )
+    return fields
+
+
+def _with_meta_columns(fields: list[str]) -> list[str]:
+    """Append {prefix}enrich_meta for every side the projection enriches."""
+    out = list(fields)
+    for prefix in ("src_", "dst_"):
+        meta = f"{prefix}{META_KEY}"
+        if meta not in out and any(f"{prefix}{k}" in out for k in ENRICH_FIELDS):
+            out.append(meta)
+    return out
+
+
 def parse_args(argv=None):
     p = argparse.ArgumentParser(
         description="CamTrace: enrich flow JSONL with PTR/ASN/Geo (local MaxMind DBs)."
@@ -35,7 +69,11 @@ def parse_args(argv=None):
         help="Enrich IPs (default based on ENRICH_IPS env var).",
     )
     p.add_argument(
-        "--in", dest="infile", default="-", help="Input JSONL (default: stdin)"
+        "--in",
+        dest="infile",
+        action="append",
+        default=None,
+        help="Input JSONL (default: stdin). Repeat to read/follow several files.",
     )
     p.add_argument(
         "--out",
@@ -48,7 +86,93 @@ def parse_args(argv=None):
         action="store_true",
         help="Output CSV instead of JSONL",
     )
-    return p.parse_args(argv)
+    p.add_argument(
+        "--inventory",
+        default=INVENTORY_DB_PATH,
+        help="Device inventory CSV (cidr,device,site,owner); with --enrich adds "
+        "src_/dst_ device/site/owner columns (default: CAMTRACE_INVENTORY env var).",
+    )
+    p.add_argument(
+        "--fields",
+        type=_parse_fields,
+        default=None,
+        help="Comma-separated output columns (default: all CSV columns). "
+        "Only the lookups these columns need are run, e.g. dst_ip,dst_asn skips DNS/Geo.",
+    )
+    p.add_argument(
+        "--skip-enriched",
+        action="store_true",
+        help="Re-enrichment: keep sources already stamped in src_/dst_enrich_meta; "
+        "only look up fields that are missing or previously failed.",
+    )
+    p.add_argument(
+        "--refresh-stale",
+        action="store_true",
+        help="Like --skip-enriched, but also refresh ASN/Geo stamped with an older "
+        "MMDB build and PTR answers older than --ptr-max-age.",
+    )
+    p.add_argument(
+        "--ptr-max-age",
+        type=float,
+        default=float(os.getenv("CAMTRACE_PTR_MAX_AGE_DAYS", "7")),
+        help="Days before a PTR answer counts as stale for --refresh-stale (default: 7)",
+    )
+    p.add_argument(
+        "--follow",
+        action="store_true",
+        help="Keep tailing --in files as they grow (handles rotation/truncation).",
+    )
+    p.add_argument(
+        "--checkpoint",
+        default=os.getenv("CAMTRACE_CHECKPOINT", ""),
+        help="Byte-offset checkpoint file for --follow; resume from it on restart.",
+    )
+    p.add_argument(
+        "--poll-interval",
+        type=float,
+        default=0.25,
+        help="Seconds between polls for new data in --follow mode (default: 0.25)",
+    )
+    p.add_argument(
+        "--batch-size",
+        type=int,
+        default=500,
+        help="Records per enrichment/output batch in --follow mode (default: 500)",
+    )
+    p.add_argument(
+        "--flush-interval",
+        type=float,
+        default=1.0,
+        help="Max seconds a record waits before its batch is flushed (default: 1.0)",
+    )
+    p.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print per-stage wall/CPU time and call counts to stderr at exit.",
+    )
+    p.add_argument(
+        "--profile-folded",
+        metavar="PATH",
+        default="",
+        help="With --profile: write collapsed stage stacks for flamegraphs to PATH.",
+    )
+    p.add_argument(
+        "--profile-cprofile",
+        metavar="PATH",
+        default="",
+        help="With --profile: also run under cProfile and dump pstats to PATH.",
+    )
+    args = p.parse_args(argv)
+    args.profile = args.profile or bool(args.profile_folded or args.profile_cprofile)
+    args.infile = args.infile or ["-"]
+    if (args.skip_enriched or args.refresh_stale) and not args.enrich:
+        p.error("--skip-enriched/--refresh-stale require --enrich")
+    if args.follow and "-" in args.infile:
+        p.error("--follow requires one or more --in FILE paths (not stdin)")
+    if args.follow and args.outfile not in ("-", "") and not args.checkpoint:
+        # The output is appended to; without offsets a restart would re-emit everything
+        p.error("--follow --out FILE requires --checkpoint (or CAMTRACE_CHECKPOINT)")
+    return args
 
 
 # ----------------- I/O helpers -----------------
@@ -60,8 +184,12 @@ def iter_jsonl(fh) -> Iterable[dict[str, Any]]:
         yield json.loads(line)
 
 
-def write_jsonl(records: Iterable[dict[str, Any]], fh) -> None:
+def write_jsonl(
+    records: Iterable[dict[str, Any]], fh, fields: list[str] | None = None
+) -> None:
     for rec in records:
+        if fields is not None:
+            rec = {k: rec[k] for k in fields if k in rec}
         fh.write(json.dumps(rec, separators=(",", ":")) + "\n")
 
 
@@ -95,6 +223,13 @@ CSV_COLUMNS = [
 ]
 
 
+INVENTORY_COLUMNS = [
+    f"{prefix}{key}" for prefix in ("src_", "dst_") for key in INVENTORY_FIELDS
+]
+
+META_COLUMNS = [f"{prefix}{META_KEY}" for prefix in ("src_", "dst_")]
+
+
 def _as_int(x):
     try:
         return int(x)
@@ -123,9 +258,15 @@ NUMERIC_FIELDS = {
 }
 
 
-def write_csv(records: Iterable[dict[str, Any]], fh) -> None:
-    writer = csv.DictWriter(fh, fieldnames=CSV_COLUMNS, extrasaction="ignore")
-    writer.writeheader()
+def write_csv(
+    records: Iterable[dict[str, Any]],
+    fh,
+    header: bool = True,
+    fields: list[str] | None = None,
+) -> None:
+    writer = csv.DictWriter(fh, fieldnames=fields or CSV_COLUMNS, extrasaction="ignore")
+    if header:
+        writer.writeheader()
     for rec in records:
         row = dict(rec)
         # coerce numerics
@@ -135,48 +276,155 @@ def write_csv(records: Iterable[dict[str, Any]], fh) -> None:
         writer.writerow(row)
 
 
-# ----------------- Main -----------------
-def main(argv=None) -> int:
-    load_dotenv()
-    args = parse_args(argv)
+def enrich_records(
+    records: Iterable[dict[str, Any]],
+    fields: list[str] | None = None,
+    inventory: DeviceInventory | None = None,
+    policy: RefreshPolicy | None = None,
+) -> Iterable[dict[str, Any]]:
+    for rec in records:
+        if "src_ip" in rec or "dst_ip" in rec:
+            enrich_flow_record(rec, fields=fields, inventory=inventory, policy=policy)
+        yield rec
+
+
+def iter_inputs(paths: list[str]) -> Iterable[dict[str, Any]]:
+    for path in paths:
+        if path in ("-", ""):
+            yield from iter_jsonl(sys.stdin)
+            continue
+        with open(path, encoding="utf-8") as fh:
+            yield from iter_jsonl(fh)
 
-    in_fh = (
-        sys.stdin if args.infile in ("-", "") else open(args.infile, encoding="utf-8")
+
+def _write_batch(args, records: Iterable[dict[str, Any]], out_fh, header: bool = True) -> None:
+    if args.csv:
+        write_csv(records, out_fh, header=header, fields=args.csv_fields)
+    else:
+        write_jsonl(records, out_fh, fields=args.fields)
+
+
+# ----------------- Follow mode -----------------
+def run_follow(
+    args,
+    out_fh,
+    inventory: DeviceInventory | None = None,
+    policy: RefreshPolicy | None = None,
+) -> int:
+    stop = threading.Event()
+    if threading.current_thread() is threading.main_thread():
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stop.set())
+
+    reader = FollowReader(
+        args.infile,
+        checkpoint_path=args.checkpoint or None,
+        poll_interval=args.poll_interval,
     )
+    # Appending to an existing CSV: don't repeat the header
+    header = not (out_fh.seekable() and out_fh.tell() > 0)
+    prof = profiling.active()
+    batches = reader.batches(args.batch_size, args.flush_interval, stop)
+    if prof is not None:
+        batches = prof.iterate("follow_read", batches)
+    try:
+        for batch in batches:
+            if args.enrich:
+                # Resolve the batch's distinct IPs together, not one record at a time
+                with profiling.stage("enrich"):
+                    flows = [r for r in batch if "src_ip" in r or "dst_ip" in r]
+                    enrich_flow_batch(flows, fields=args.fields, inventory=inventory, policy=policy)
+            with profiling.stage("write"):
+                _write_batch(args, batch, out_fh, header)
+            header = False
+            out_fh.flush()
+            if out_fh is not sys.stdout:
+                # Output must be on disk before the (fsynced) checkpoint moves past it
+                os.fsync(out_fh.fileno())
+            # Checkpoint only after the batch has been flushed to the output
+            reader.commit()
+    finally:
+        reader.close()
+    return 0
+
+
+# ----------------- Main -----------------
+def run(args) -> int:
+    inventory = None
+    if args.enrich and args.inventory:
+        inventory = DeviceInventory.from_csv(args.inventory)
+
+    args.csv_fields = args.fields
+    if args.enrich:
+        # Stamps must reach the output, or a later --skip-enriched pass redoes everything
+        if args.fields is not None:
+            args.fields = args.csv_fields = _with_meta_columns(args.fields)
+        else:
+            args.csv_fields = (
+                CSV_COLUMNS + (INVENTORY_COLUMNS if inventory else []) + META_COLUMNS
+            )
+
+    policy = None
+    if args.skip_enriched or args.refresh_stale:
+        policy = RefreshPolicy(
+            refresh_stale=args.refresh_stale, ptr_max_age=args.ptr_max_age * 86400
+        )
+
     out_fh = (
         sys.stdout
         if args.outfile in ("-", "")
-        else open(args.outfile, "w", encoding="utf-8")
+        # follow mode resumes from a checkpoint, so keep what is already written
+        else open(args.outfile, "a" if args.follow else "w", encoding="utf-8")
     )
 
     try:
-        records = iter_jsonl(in_fh)
+        if args.follow:
+            return run_follow(args, out_fh, inventory, policy)
 
-        # optional enrichment (avoid self-referential generator)
-        if args.enrich:
-            orig_records = records  # capture the original iterator
+        prof = profiling.active()
+        records = iter_inputs(args.infile)
+        if prof is not None:
+            records = prof.iterate("parse", records)
 
-            def gen(records_iter):
-                for rec in records_iter:
-                    if "src_ip" in rec or "dst_ip" in rec:
-                        enrich_flow_record(rec)
-                    yield rec
-
-            records = gen(orig_records)
+        # optional enrichment
+        if args.enrich:
+            records = enrich_records(records, args.fields, inventory, policy)
+            if prof is not None:
+                records = prof.iterate("enrich", records)
 
         # output
-        if args.csv:
-            write_csv(records, out_fh)
-        else:
-            write_jsonl(records, out_fh)
+        with profiling.stage("write"):
+            _write_batch(args, records, out_fh)
         return 0
 
     finally:
-        if in_fh is not sys.stdin:
-            in_fh.close()
         if out_fh is not sys.stdout:
             out_fh.close()
 
 
+def main(argv=None) -> int:
+    load_dotenv()
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv[:1] == ["summarize"]:
+        from camtrace.summarize import main as summarize_main  # numpy is optional
+
+        return summarize_main(argv[1:])
+
+    args = parse_args(argv)
+    if not args.profile:
+        return run(args)
+
+    profiling.enable(cprofile=bool(args.profile_cprofile))
+    try:
+        return run(args)
+    finally:
+        prof = profiling.disable()
+        prof.report(sys.stderr)
+        if args.profile_folded:
+            prof.write_folded(args.profile_folded)
+        if args.profile_cprofile:
+            prof.dump_cprofile(args.profile_cprofile)
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
@@ -1,52 +1,204 @@
 # src/camtrace/enrich_adapter.py
 from __future__ import annotations
 
-import ipaddress
-from typing import Any
+import time
+from collections.abc import Collection, Sequence
+from functools import lru_cache
+from typing import Any, NamedTuple
 
-from camtrace.ip_enricher import resolve_ip
+from camtrace.inventory import INVENTORY_FIELDS, DeviceInventory
+from camtrace.ip_enricher import (
+    ENRICH_FIELDS,
+    FIELD_SOURCE,
+    get_enricher,
+    resolve_ip,
+    resolve_many,
+)
+from camtrace.iputil import is_public_ip
+
+# Timed by camtrace.profiling when --profile is on
+PROFILE_HOOKS = (
+    ("_is_public", "classify"),
+    ("resolve_ip", "resolve_ip"),
+    ("resolve_many", "resolve_many"),
+)
+
+
+# ---- Enrichment stamps ----
+# Each enriched side carries "{prefix}enrich_meta", e.g.
+#   "asn=1727740800;city=1727740800;ptr=1729331000"
+# i.e. MMDB build epochs and the PTR answer time (see EnrichedIP.enrich_meta).
+META_KEY = "enrich_meta"
+
+
+def parse_meta(value: Any) -> dict[str, int]:
+    if not value or not isinstance(value, str):
+        return {}
+    out: dict[str, int] = {}
+    for part in value.split(";"):
+        src, _, stamp = part.partition("=")
+        try:
+            out[src] = int(stamp)
+        except ValueError:
+            continue
+    return out
+
+
+def format_meta(meta: dict[str, int]) -> str:
+    return ";".join(f"{src}={meta[src]}" for src in sorted(meta))
+
+
+class RefreshPolicy(NamedTuple):
+    """
+    Which already-stamped sources a re-pass may keep.
+    Default (skip-enriched): any stamped source is kept; only missing or
+    failed ones are looked up. With `refresh_stale`, ASN/City stamps must
+    match the loaded DB build and PTR stamps must be younger than
+    `ptr_max_age` seconds.
+    """
+
+    refresh_stale: bool = False
+    ptr_max_age: float = 7 * 86400
+
+    def fresh(self, meta: dict[str, int]) -> frozenset[str]:
+        if not self.refresh_stale:
+            return frozenset(meta)
+        builds = get_enricher().build_epochs
+        now = time.time()
+        return frozenset(
+            src
+            for src, stamp in meta.items()
+            if (now - stamp < self.ptr_max_age if src == "ptr" else stamp == builds.get(src))
+        )
 
 
 def _is_public(ip: str | None) -> bool:
-    try:
-        return ip is not None and ipaddress.ip_address(ip).is_global
-    except ValueError:
-        return False
+    # Cached, integer range check for IPv4; ipaddress fallback for IPv6
+    return ip is not None and is_public_ip(ip)
+
 
+@lru_cache(maxsize=64)
+def _wanted(
+    prefix: str, fields: tuple[str, ...] | None, names: tuple[str, ...] = ENRICH_FIELDS
+) -> tuple[str, ...]:
+    """Fields from `names` (unprefixed) needed on one side for the output `fields`."""
+    if fields is None:
+        return names
+    return tuple(k for k in names if f"{prefix}{k}" in fields)
+
+
+def _stale(
+    prefix: str,
+    rec: dict[str, Any],
+    keys: tuple[str, ...],
+    meta: dict[str, int],
+    policy: RefreshPolicy | None,
+) -> tuple[str, ...]:
+    """The `keys` whose source still has to be looked up under `policy`."""
+    if policy is None:
+        return keys
+    # A stamp covers a whole source, but an earlier projection may have kept
+    # only some of its columns: a source missing any wanted column is stale.
+    missing = {FIELD_SOURCE[k] for k in keys if f"{prefix}{k}" not in rec}
+    fresh = policy.fresh(meta) - missing
+    return tuple(k for k in keys if FIELD_SOURCE[k] not in fresh)
+
+
+def _apply(
+    prefix: str,
+    ip: str | None,
+    rec: dict[str, Any],
+    keys: tuple[str, ...] = ENRICH_FIELDS,
+    policy: RefreshPolicy | None = None,
+) -> None:
+    if not keys:
+        return
 
-def _apply(prefix: str, ip: str | None, rec: dict[str, Any]) -> None:
     # Skip enrichment for private/reserved/invalid IPs,
     # but ensure columns exist (set to None) for CSV.
     if not _is_public(ip):
-        for key in (
-            "ptr",
-            "asn",
-            "as_org",
-            "country_iso",
-            "country_name",
-            "region",
-            "city",
-            "latitude",
-            "longitude",
-        ):
+        for key in keys:
             rec.setdefault(f"{prefix}{key}", None)
         return
 
-    e = resolve_ip(ip)
-    rec[f"{prefix}ptr"] = e.ptr
-    rec[f"{prefix}asn"] = e.asn
-    rec[f"{prefix}as_org"] = e.as_org
-    rec[f"{prefix}country_iso"] = e.country_iso
-    rec[f"{prefix}country_name"] = e.country_name
-    rec[f"{prefix}region"] = e.region
-    rec[f"{prefix}city"] = e.city
-    rec[f"{prefix}latitude"] = e.latitude
-    rec[f"{prefix}longitude"] = e.longitude
+    meta_key = f"{prefix}{META_KEY}"
+    meta = parse_meta(rec.get(meta_key))
+    keys = _stale(prefix, rec, keys, meta, policy)
+    if not keys:
+        return
+
+    e = resolve_ip(ip, keys)
+    for key in keys:
+        src = FIELD_SOURCE[key]
+        # A failed lookup (e.g. PTR timeout) must not clobber previously
+        # stamped data; the old stamp stays and the next pass retries it.
+        if src in e.enrich_meta or src not in meta:
+            rec[f"{prefix}{key}"] = getattr(e, key)
+    for src in {FIELD_SOURCE[k] for k in keys} & e.enrich_meta.keys():
+        meta[src] = e.enrich_meta[src]
+    rec[meta_key] = format_meta(meta)
 
 
 def enrich_flow_record(
-    flow: dict[str, Any], src_key: str = "src_ip", dst_key: str = "dst_ip"
+    flow: dict[str, Any],
+    src_key: str = "src_ip",
+    dst_key: str = "dst_ip",
+    fields: Collection[str] | None = None,
+    inventory: DeviceInventory | None = None,
+    policy: RefreshPolicy | None = None,
 ) -> dict[str, Any]:
-    _apply("src_", flow.get(src_key), flow)
-    _apply("dst_", flow.get(dst_key), flow)
+    """
+    Add src_*/dst_* enrichment columns to `flow` in place.
+    `fields` limits enrichment to the output columns listed (e.g. {"dst_asn"});
+    sides/sources with nothing requested are never looked up.
+    With an `inventory`, src_/dst_ device, site and owner are labelled too.
+    With a `policy`, sources already stamped in {prefix}enrich_meta (and
+    still fresh under it) are kept instead of being resolved again.
+    """
+    projection = tuple(fields) if fields is not None else None
+    for prefix, key in (("src_", src_key), ("dst_", dst_key)):
+        ip = flow.get(key)
+        _apply(prefix, ip, flow, _wanted(prefix, projection), policy)
+        if inventory is not None:
+            inventory.label(prefix, ip, flow, _wanted(prefix, projection, INVENTORY_FIELDS))
     return flow
+
+
+def enrich_flow_batch(
+    flows: Sequence[dict[str, Any]],
+    src_key: str = "src_ip",
+    dst_key: str = "dst_ip",
+    fields: Collection[str] | None = None,
+    inventory: DeviceInventory | None = None,
+    policy: RefreshPolicy | None = None,
+    max_workers: int = 8,
+) -> Sequence[dict[str, Any]]:
+    """
+    enrich_flow_record() for a batch of flows. The distinct public IPs the
+    batch still needs are resolved concurrently first (resolve_many), so
+    uncached PTR lookups overlap instead of blocking one record at a time;
+    the records are then filled from the warm cache.
+    """
+    projection = tuple(fields) if fields is not None else None
+    need: dict[str, set[str]] = {}
+    for flow in flows:
+        for prefix, key in (("src_", src_key), ("dst_", dst_key)):
+            ip = flow.get(key)
+            keys = _wanted(prefix, projection)
+            if not keys or not _is_public(ip):
+                continue
+            meta = parse_meta(flow.get(f"{prefix}{META_KEY}"))
+            keys = _stale(prefix, flow, keys, meta, policy)
+            if keys:
+                need.setdefault(ip, set()).update(keys)
+
+    # One resolve_many per distinct field set (usually just one)
+    groups: dict[tuple[str, ...], list[str]] = {}
+    for ip, keys in need.items():
+        groups.setdefault(tuple(k for k in ENRICH_FIELDS if k in keys), []).append(ip)
+    for keys, ips in groups.items():
+        resolve_many(ips, keys, max_workers)
+
+    for flow in flows:
+        enrich_flow_record(flow, src_key, dst_key, fields, inventory, policy)
+    return flows
@@ -0,0 +1,272 @@
+# src/camtrace/follow.py
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Iterator, Sequence
+from pathlib import Path
+from typing import Any
+
+LOGGER = logging.getLogger(__name__)
+
+# Upper bound on bytes read from one file per poll, so a large backlog is
+# consumed in slices instead of being loaded into memory at once.
+READ_CHUNK = 1 << 20
+
+CHECKPOINT_VERSION = 1
+
+
+# ---- Checkpoint persistence ----
+def load_checkpoint(path: str | os.PathLike[str] | None) -> dict[str, dict[str, int]]:
+    """Return {abs_path: {"inode": int, "offset": int}} or {} if none saved yet."""
+    if not path:
+        return {}
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        LOGGER.warning("Ignoring unreadable checkpoint %s: %s", path, e)
+        return {}
+    files = data.get("files") if isinstance(data, dict) else None
+    return files if isinstance(files, dict) else {}
+
+
+def save_checkpoint(
+    path: str | os.PathLike[str], files: dict[str, dict[str, int]]
+) -> None:
+    """Atomically write the checkpoint (tmp file + rename) so a crash never leaves it torn."""
+    target = Path(path)
+    tmp = target.with_name(target.name + ".tmp")
+    payload = {"version": CHECKPOINT_VERSION, "files": files}
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(payload, fh, separators=(",", ":"))
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, target)
+
+
+# ---- Single-file tailer ----
+class FileTailer:
+    """
+    Incrementally read complete lines from one growing file.
+
+    `offset` is always the byte position just past the last complete line
+    handed out, which is what gets checkpointed. A trailing partial line is
+    buffered until its newline arrives.
+    """
+
+    def __init__(self, path: str | os.PathLike[str], inode: int | None = None, offset: int = 0):
+        self.path = os.path.abspath(path)
+        self.inode = inode
+        self.offset = offset
+        self._fh = None
+        self._buf = b""
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def _open(self, offset: int, path: str | None = None) -> bool:
+        try:
+            fh = open(path or self.path, "rb")
+        except FileNotFoundError:
+            return False
+        st = os.fstat(fh.fileno())
+        if st.st_size < offset:
+            LOGGER.warning("%s shorter than checkpoint; restarting at 0", self.path)
+            offset = 0
+        fh.seek(offset)
+        self._fh = fh
+        self._buf = b""
+        self.inode = st.st_ino
+        self.offset = offset
+        return True
+
+    def _start(self) -> bool:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        # Only trust a saved offset if it refers to the same file we now see
+        if self.inode in (None, st.st_ino):
+            return self._open(self.offset)
+        # Rotated while we were stopped: finish the old file (e.g. flows.jsonl.1)
+        # from the saved offset first; poll() then moves on to the new one.
+        rotated = self._find_inode(st.st_dev)
+        if rotated is not None:
+            LOGGER.info(
+                "%s was rotated since the checkpoint; draining %s from offset %d first",
+                self.path,
+                rotated,
+                self.offset,
+            )
+            return self._open(self.offset, rotated)
+        if self.offset:
+            LOGGER.error(
+                "%s was rotated since the checkpoint and the old file (inode %d) is gone; "
+                "its unread tail after offset %d is lost. Starting the new file at 0",
+                self.path,
+                self.inode,
+                self.offset,
+            )
+        return self._open(0)
+
+    def _find_inode(self, dev: int) -> str | None:
+        """Path of the checkpointed file in the same directory, if it still exists."""
+        try:
+            with os.scandir(os.path.dirname(self.path)) as entries:
+                for entry in entries:
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if st.st_ino == self.inode and st.st_dev == dev:
+                        return entry.path
+        except OSError:
+            pass
+        return None
+
+    def _drain(self) -> list[tuple[bytes, int, int]]:
+        out: list[tuple[bytes, int, int]] = []
+        data = self._fh.read(READ_CHUNK)
+        if not data:
+            return out
+        buf = self._buf + data
+        start = 0
+        while True:
+            nl = buf.find(b"\n", start)
+            if nl < 0:
+                break
+            self.offset += nl + 1 - start
+            out.append((buf[start:nl], self.inode, self.offset))
+            start = nl + 1
+        self._buf = buf[start:]
+        return out
+
+    def poll(self) -> list[tuple[bytes, int, int]]:
+        """
+        Return newly completed lines as (line, inode, end_offset) tuples.
+        Handles truncation (restart at 0) and rotation (finish the old file,
+        then switch to the new one at the same path).
+        """
+        if self._fh is None and not self._start():
+            return []
+
+        lines = self._drain()
+        if lines:
+            # More may be waiting; the caller polls again without sleeping.
+            return lines
+
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            # Rotated away and the replacement does not exist yet
+            return lines
+
+        if st.st_ino != self.inode:
+            LOGGER.info("%s rotated; switching to new file", self.path)
+            self.close()
+            if self._open(0):
+                lines.extend(self._drain())
+        elif st.st_size < self._fh.tell():
+            LOGGER.info("%s truncated; restarting at 0", self.path)
+            self._fh.seek(0)
+            self._buf = b""
+            self.offset = 0
+            lines.extend(self._drain())
+        return lines
+
+
+# ---- Multi-file follower with batching + checkpointing ----
+class FollowReader:
+    """
+    Tail one or more JSONL files and yield batches of parsed records.
+
+    A batch is emitted once it reaches `batch_size` records or its oldest
+    record has waited `flush_interval` seconds. Call `commit()` after the
+    batch has been written out; only then are its offsets checkpointed, so a
+    restart neither drops nor re-emits records.
+    """
+
+    def __init__(
+        self,
+        paths: Sequence[str | os.PathLike[str]],
+        checkpoint_path: str | os.PathLike[str] | None = None,
+        poll_interval: float = 0.25,
+    ):
+        self.checkpoint_path = checkpoint_path
+        self.poll_interval = poll_interval
+        self._positions = load_checkpoint(checkpoint_path)
+        self._pending: dict[str, dict[str, int]] = {}
+        self._tailers: list[FileTailer] = []
+        for p in paths:
+            saved = self._positions.get(os.path.abspath(p), {})
+            self._tailers.append(
+                FileTailer(p, inode=saved.get("inode"), offset=int(saved.get("offset", 0)))
+            )
+
+    def close(self) -> None:
+        for t in self._tailers:
+            t.close()
+
+    def commit(self) -> None:
+        """Persist the offsets of every record yielded so far."""
+        if not self._pending:
+            return
+        self._positions.update(self._pending)
+        self._pending = {}
+        if self.checkpoint_path:
+            save_checkpoint(self.checkpoint_path, self._positions)
+
+    def _poll_all(self, batch: list[dict[str, Any]]) -> int:
+        got = 0
+        for t in self._tailers:
+            for raw, inode, end in t.poll():
+                self._pending[t.path] = {"inode": inode, "offset": end}
+                line = raw.strip()
+                if not line:
+                    continue
+                try:
+                    batch.append(json.loads(line))
+                except ValueError as e:
+                    LOGGER.warning("Skipping malformed line in %s @%d: %s", t.path, end, e)
+                    continue
+                got += 1
+        return got
+
+    def batches(
+        self,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        stop: threading.Event | None = None,
+    ) -> Iterator[list[dict[str, Any]]]:
+        stop = stop or threading.Event()
+        batch: list[dict[str, Any]] = []
+        first_at = 0.0
+
+        while not stop.is_set():
+            had = len(batch)
+            got = self._poll_all(batch)
+            if got and not had:
+                first_at = time.monotonic()
+
+            if batch and (
+                len(batch) >= batch_size or time.monotonic() - first_at >= flush_interval
+            ):
+                out, batch = batch, []
+                yield out
+                continue
+
+            if not got:
+                timeout = self.poll_interval
+                if batch:
+                    timeout = min(timeout, max(0.0, first_at + flush_interval - time.monotonic()))
+                stop.wait(timeout)
+
+        if batch:
+            yield batch
@@ -0,0 +1,133 @@
+# src/camtrace/inventory.py
+"""Local device inventory: map IPs/CIDRs to a device name, site and owner.
+
+The inventory is a CSV file with a header row:
+
+    cidr,device,site,owner
+    192.168.1.10,front-door-cam,home,ty
+    192.168.1.0/24,,home,ty
+
+`cidr` may be a single address (an `ip` column is accepted too). When
+ranges overlap, the most specific (longest prefix) entry wins.
+"""
+
+from __future__ import annotations
+
+import csv
+import ipaddress
+import os
+from bisect import bisect_right
+from typing import Any, NamedTuple
+
+from camtrace.iputil import ip_to_int
+
+INVENTORY_FIELDS: tuple[str, ...] = ("device", "site", "owner")
+INVENTORY_DB_PATH = os.getenv("CAMTRACE_INVENTORY", "")
+
+# Timed by camtrace.profiling when --profile is on
+PROFILE_HOOKS = (("DeviceInventory.label", "inventory"),)
+
+
+class DeviceInfo(NamedTuple):
+    device: str | None
+    site: str | None
+    owner: str | None
+
+
+class _Table:
+    """Disjoint sorted [start, end] segments for one address family; bisect lookup."""
+
+    def __init__(self, entries: list[tuple[int, int, int, DeviceInfo]]):
+        # entries: (start, end, prefixlen, info). Sorting by (start, prefixlen)
+        # puts every enclosing network before the networks nested inside it.
+        entries.sort(key=lambda e: (e[0], e[2]))
+        segs: list[tuple[int, int, DeviceInfo]] = []
+        stack: list[tuple[int, DeviceInfo]] = []  # (end, info), innermost last
+        pos = 0
+
+        def emit_until(limit: int) -> None:
+            nonlocal pos
+            # Close every open network that ends before `limit`
+            while stack and stack[-1][0] < limit:
+                end, info = stack.pop()
+                if pos <= end:
+                    segs.append((pos, end, info))
+                    pos = end + 1
+
+        for start, end, _, info in entries:
+            emit_until(start)
+            if stack and pos < start:
+                segs.append((pos, start - 1, stack[-1][1]))
+            pos = start
+            stack.append((end, info))
+        emit_until(1 << 128)
+
+        self._starts = [s for s, _, _ in segs]
+        self._ends = [e for _, e, _ in segs]
+        self._infos = [i for _, _, i in segs]
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def lookup(self, n: int) -> DeviceInfo | None:
+        i = bisect_right(self._starts, n) - 1
+        if i >= 0 and n <= self._ends[i]:
+            return self._infos[i]
+        return None
+
+
+class DeviceInventory:
+    def __init__(self, rows: list[tuple[str, DeviceInfo]]):
+        by_version: dict[int, list[tuple[int, int, int, DeviceInfo]]] = {4: [], 6: []}
+        for cidr, info in rows:
+            net = ipaddress.ip_network(cidr, strict=False)
+            by_version[net.version].append(
+                (int(net.network_address), int(net.broadcast_address), net.prefixlen, info)
+            )
+        self._tables = {v: _Table(e) for v, e in by_version.items()}
+
+    @classmethod
+    def from_csv(cls, path: str | os.PathLike[str]) -> DeviceInventory:
+        if not os.path.isfile(path):
+            raise FileNotFoundError(
+                f"Device inventory not found at '{path}'. "
+                f"Set CAMTRACE_INVENTORY or pass --inventory correctly."
+            )
+        rows: list[tuple[str, DeviceInfo]] = []
+        with open(path, encoding="utf-8", newline="") as fh:
+            for lineno, row in enumerate(csv.DictReader(fh), start=2):
+                cidr = (row.get("cidr") or row.get("ip") or "").strip()
+                if not cidr or cidr.startswith("#"):
+                    continue
+                info = DeviceInfo(
+                    *((row.get(k) or "").strip() or None for k in INVENTORY_FIELDS)
+                )
+                try:
+                    ipaddress.ip_network(cidr, strict=False)
+                except ValueError as e:
+                    raise ValueError(f"{path}:{lineno}: invalid cidr {cidr!r}: {e}") from e
+                rows.append((cidr, info))
+        return cls(rows)
+
+    def lookup(self, ip: str | None) -> DeviceInfo | None:
+        if not ip:
+            return None
+        parsed = ip_to_int(ip)
+        if parsed is None:
+            return None
+        version, n = parsed
+        return self._tables[version].lookup(n)
+
+    def label(
+        self,
+        prefix: str,
+        ip: str | None,
+        rec: dict[str, Any],
+        keys: tuple[str, ...] = INVENTORY_FIELDS,
+    ) -> None:
+        """Set {prefix}device/site/owner on `rec` (None when the IP is not listed)."""
+        if not keys:
+            return
+        info = self.lookup(ip)
+        for key in keys:
+            rec[f"{prefix}{key}"] = getattr(info, key) if info else None
@@ -2,14 +2,19 @@
 from __future__ import annotations
 
 import os
-from functools import lru_cache
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Collection, Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
 
 import dns.resolver
 import dns.reversename
 from dotenv import load_dotenv
 from geoip2.database import Reader
 from geoip2.errors import AddressNotFoundError
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 # Load .env once on import
 load_dotenv()
@@ -21,6 +26,13 @@ DNS_RESOLVER = os.getenv(
     "DNS_RESOLVER", ""
 ).strip()  # e.g., "1.1.1.1" or blank for system default
 
+# Timed by camtrace.profiling when --profile is on
+PROFILE_HOOKS = (
+    ("IPEnricher._asn_lookup", "maxmind_asn"),
+    ("IPEnricher._city_lookup", "maxmind_city"),
+    ("IPEnricher._ptr_lookup", "dns_ptr"),
+)
+
 
 # ---- Pydantic return model ----
 class EnrichedIP(BaseModel):
@@ -37,6 +49,38 @@ class EnrichedIP(BaseModel):
     latitude: float | None = None
     longitude: float | None = None
 
+    # source -> stamp of the data behind it: MMDB build epoch for "asn"/"city",
+    # unix time of a definitive answer for "ptr". A source missing here was not
+    # looked up, its lookup failed, or its DB is not configured.
+    enrich_meta: dict[str, int] = Field(default_factory=dict)
+
+
+# ---- Field -> lookup source mapping ----
+# Each source is one backend call; a field is only worth fetching if its
+# source has to run anyway, so projections are resolved at source granularity.
+SOURCE_FIELDS: dict[str, tuple[str, ...]] = {
+    "ptr": ("ptr",),
+    "asn": ("asn", "as_org"),
+    "city": (
+        "country_iso",
+        "country_name",
+        "region",
+        "city",
+        "latitude",
+        "longitude",
+    ),
+}
+FIELD_SOURCE = {f: src for src, fields in SOURCE_FIELDS.items() for f in fields}
+ENRICH_FIELDS: tuple[str, ...] = tuple(FIELD_SOURCE)
+ALL_SOURCES = frozenset(SOURCE_FIELDS)
+
+
+def sources_for(fields: Iterable[str] | None) -> frozenset[str]:
+    """Lookup sources needed to produce `fields` (None = every field)."""
+    if fields is None:
+        return ALL_SOURCES
+    return frozenset(FIELD_SOURCE[f] for f in fields if f in FIELD_SOURCE)
+
 
 def _build_resolver() -> dns.resolver.Resolver:
     r = dns.resolver.Resolver()
@@ -49,14 +93,25 @@ def _build_resolver() -> dns.resolver.Resolver:
     return r
 
 
+CACHE_MAXSIZE = 8192
+
+
 class IPEnricher:
     """
     Reusable, process-wide readers + DNS resolver.
     Keeping one instance around and call .resolve(ip).
+
+    Safe to share across threads: MaxMind readers are read-only and shared,
+    each thread gets its own DNS resolver, the LRU cache is lock-protected,
+    and concurrent misses for the same IP/source are coalesced into a
+    single lookup whose result every waiting caller receives.
     """
 
     def __init__(
-        self, asn_db_path: str = ASN_DB_PATH, city_db_path: str = CITY_DB_PATH
+        self,
+        asn_db_path: str = ASN_DB_PATH,
+        city_db_path: str = CITY_DB_PATH,
+        cache_size: int = CACHE_MAXSIZE,
     ):
         # Validate files exist early with friendly errors
         for label, path in (("ASN DB", asn_db_path), ("City DB", city_db_path)):
@@ -69,39 +124,70 @@ class IPEnricher:
         # Open readers (these are safe to reuse across lookups)
         self._asn_reader = Reader(asn_db_path) if asn_db_path else None
         self._city_reader = Reader(city_db_path) if city_db_path else None
+        self.build_epochs = {
+            "asn": self._asn_reader.metadata().build_epoch if self._asn_reader else 0,
+            "city": self._city_reader.metadata().build_epoch if self._city_reader else 0,
+        }
 
-        self._resolver = _build_resolver()
+        self._local = threading.local()  # per-thread dns.resolver.Resolver
+
+        # ip -> (EnrichedIP, sources already run); guarded by _lock
+        self._cache_size = cache_size
+        self._cache: OrderedDict[str, tuple[EnrichedIP, frozenset[str]]] = OrderedDict()
+        # (ip, source) -> Future of that source's fields while a lookup runs
+        self._inflight: dict[tuple[str, str], Future] = {}
+        self._lock = threading.Lock()
 
     def close(self) -> None:
-        if self._asn_reader:
-            self._asn_reader.close()
-        if self._city_reader:
-            self._city_reader.close()
+        with self._lock:
+            if self._asn_reader:
+                self._asn_reader.close()
+            if self._city_reader:
+                self._city_reader.close()
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    @property
+    def _resolver(self) -> dns.resolver.Resolver:
+        r = getattr(self._local, "resolver", None)
+        if r is None:
+            r = self._local.resolver = _build_resolver()
+        return r
 
     # ---- Internal helpers ----
-    def _ptr_lookup(self, ip: str) -> str | None:
+    def _ptr_lookup(self, ip: str) -> tuple[str | None, bool]:
+        """(name, definitive): NXDOMAIN/no answer is a real "no PTR", a timeout is not."""
         try:
             rev = dns.reversename.from_address(ip)
             ans = self._resolver.resolve(rev, "PTR")
             # Return the first PTR name as a string without trailing dot
-            return str(ans[0]).rstrip(".") if ans and len(ans) else None
+            return (str(ans[0]).rstrip(".") if ans and len(ans) else None), True
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+            return None, True
         except Exception:
-            return None
+            return None, False
 
-    def _asn_lookup(self, ip: str) -> tuple[int | None, str | None]:
+    def _asn_lookup(self, ip: str) -> tuple[tuple[int | None, str | None], bool]:
+        """
+        ((asn, org), definitive): not-in-DB is a real answer; a reader error
+        or no configured DB is not, so the source stays unstamped.
+        """
         if not self._asn_reader:
-            return None, None
+            return (None, None), False
         try:
             rec = self._asn_reader.asn(ip)
-            return rec.autonomous_system_number, rec.autonomous_system_organization
+            return (rec.autonomous_system_number, rec.autonomous_system_organization), True
         except AddressNotFoundError:
-            return None, None
+            return (None, None), True
         except Exception:
-            return None, None
+            return (None, None), False
 
     def _city_lookup(self, ip: str):
+        """((country_iso, country_name, region, city, lat, lon), definitive)."""
         if not self._city_reader:
-            return None, None, None, None, None, None
+            return (None, None, None, None, None, None), False
         try:
             rec = self._city_reader.city(ip)
             country_iso = rec.country.iso_code
@@ -110,41 +196,203 @@ class IPEnricher:
             city = rec.city.name
             lat = rec.location.latitude
             lon = rec.location.longitude
-            return country_iso, country_name, region, city, lat, lon
+            return (country_iso, country_name, region, city, lat, lon), True
         except AddressNotFoundError:
-            return None, None, None, None, None, None
+            return (None, None, None, None, None, None), True
         except Exception:
-            return None, None, None, None, None, None
-
-    # ---- Public API (one-shot resolver) ----
-    def resolve(self, ip: str) -> EnrichedIP:
-        asn_num, as_org = self._asn_lookup(ip)
-        country_iso, country_name, region, city, lat, lon = self._city_lookup(ip)
-        ptr = self._ptr_lookup(ip)
-
-        return EnrichedIP(
-            ip=ip,
-            ptr=ptr,
-            asn=asn_num,
-            as_org=as_org,
-            country_iso=country_iso,
-            country_name=country_name,
-            region=region,
-            city=city,
-            latitude=lat,
-            longitude=lon,
+            return (None, None, None, None, None, None), False
+
+    def lookup(self, ip: str, sources: Collection[str] = ALL_SOURCES) -> dict[str, Any]:
+        """
+        Run only the requested sources; returns {field: value} for them plus
+        "enrich_meta" stamps for the sources that answered definitively
+        (a reader error or DNS timeout leaves its source unstamped).
+        """
+        out: dict[str, Any] = {}
+        meta: dict[str, int] = {}
+        if "asn" in sources:
+            (out["asn"], out["as_org"]), ok = self._asn_lookup(ip)
+            if ok:
+                meta["asn"] = self.build_epochs["asn"]
+        if "city" in sources:
+            (
+                out["country_iso"],
+                out["country_name"],
+                out["region"],
+                out["city"],
+                out["latitude"],
+                out["longitude"],
+            ), ok = self._city_lookup(ip)
+            if ok:
+                meta["city"] = self.build_epochs["city"]
+        if "ptr" in sources:
+            out["ptr"], ok = self._ptr_lookup(ip)
+            if ok:
+                meta["ptr"] = int(time.time())
+        out["enrich_meta"] = meta
+        return out
+
+    def _cached(self, ip: str, need: frozenset[str]) -> EnrichedIP | None:
+        with self._lock:
+            hit = self._cache.get(ip)
+            if hit is None or not need <= hit[1]:
+                return None
+            self._cache.move_to_end(ip)
+            return hit[0]
+
+    def _store(
+        self,
+        ip: str,
+        base: EnrichedIP,
+        values: dict[str, Any],
+        meta: dict[str, int],
+        sources: frozenset[str],
+    ) -> EnrichedIP:
+        # Caller holds _lock. Merge into whatever is cached now (another
+        # thread may have added sources meanwhile), else into our snapshot.
+        # `sources` counts attempted lookups, so a PTR timeout is not retried
+        # for every flow in this process but stays unstamped in `meta`.
+        hit = self._cache.get(ip)
+        if hit is not None:
+            base, sources = hit[0], hit[1] | sources
+        enriched = base.model_copy(
+            update={**values, "enrich_meta": {**base.enrich_meta, **meta}}
         )
+        self._cache[ip] = (enriched, sources)
+        self._cache.move_to_end(ip)
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return enriched
+
+    # ---- Public API ----
+    def resolve(self, ip: str, fields: Iterable[str] | None = None) -> EnrichedIP:
+        """
+        Cached EnrichedIP for one IP. With `fields`, only the sources those
+        fields need are queried (e.g. ASN-only never touches DNS); a later
+        call asking for more fields runs just the missing sources.
+        """
+        need = sources_for(fields)
+        with self._lock:
+            hit = self._cache.get(ip)
+            if hit is not None:
+                self._cache.move_to_end(ip)
+                if need <= hit[1]:
+                    return hit[0]
+            base, done = hit if hit is not None else (EnrichedIP(ip=ip), frozenset())
+
+            # Claim each missing source, or join the lookup already running
+            mine: dict[str, Future] = {}
+            theirs: dict[str, Future] = {}
+            for src in need - done:
+                fut = self._inflight.get((ip, src))
+                if fut is None:
+                    fut = self._inflight[(ip, src)] = Future()
+                    mine[src] = fut
+                else:
+                    theirs[src] = fut
+
+        values: dict[str, Any] = {}
+        meta: dict[str, int] = {}
+        enriched = base
+        if mine:
+            # Settle our claimed sources before joining anyone else's, and
+            # always: a future left pending would block later callers forever.
+            error: BaseException | None = None
+            try:
+                values = self.lookup(ip, mine)
+                meta.update(values.pop("enrich_meta", {}))
+                with self._lock:
+                    enriched = self._store(ip, base, values, meta, done | frozenset(mine))
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                with self._lock:
+                    for src in mine:
+                        del self._inflight[(ip, src)]
+                # Wake joiners only once the cache already holds the result
+                for src, fut in mine.items():
+                    if error is not None:
+                        fut.set_exception(error)
+                    else:
+                        fut.set_result(
+                            (
+                                {f: values[f] for f in SOURCE_FIELDS[src]},
+                                {src: meta[src]} if src in meta else {},
+                            )
+                        )
+
+        if theirs:
+            for fut in theirs.values():
+                got, stamp = fut.result()
+                values.update(got)
+                meta.update(stamp)
+            with self._lock:
+                enriched = self._store(ip, base, values, meta, done | need)
+        return enriched
+
+    def resolve_many(
+        self,
+        ips: Iterable[str],
+        fields: Iterable[str] | None = None,
+        max_workers: int = 8,
+    ) -> dict[str, EnrichedIP]:
+        """
+        Resolve a batch of IPs: cache hits are answered inline, misses are
+        looked up concurrently (PTR queries dominate, so threads overlap them).
+        """
+        fields = None if fields is None else tuple(fields)
+        need = sources_for(fields)
+        out: dict[str, EnrichedIP] = {}
+        misses: list[str] = []
+        for ip in dict.fromkeys(ips):
+            hit = self._cached(ip, need)
+            if hit is not None:
+                out[ip] = hit
+            else:
+                misses.append(ip)
+
+        if len(misses) <= 1 or max_workers <= 1:
+            out.update((ip, self.resolve(ip, fields)) for ip in misses)
+            return out
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(misses))) as pool:
+            resolved = pool.map(lambda ip: self.resolve(ip, fields), misses)
+            out.update(zip(misses, resolved, strict=True))
+        return out
 
 
 # ---- Convenient module-level cached function ----
 # This gives easy caching without managing an instance elsewhere.
-# Keep one global enrich er + LRU over IPs.
-_enricher_singleton = IPEnricher()
+# One global enricher, created on first use (double-checked under a lock
+# so concurrent first callers still share a single instance).
+_enricher_singleton: IPEnricher | None = None
+_singleton_lock = threading.Lock()
 
 
-@lru_cache(maxsize=8192)
-def resolve_ip(ip: str) -> EnrichedIP:
+def get_enricher() -> IPEnricher:
+    global _enricher_singleton
+    if _enricher_singleton is None:
+        with _singleton_lock:
+            if _enricher_singleton is None:
+                _enricher_singleton = IPEnricher()
+    return _enricher_singleton
+
+
+def resolve_ip(ip: str, fields: Iterable[str] | None = None) -> EnrichedIP:
     """
     Cached convenience wrapper: EnrichedIP for a single IP.
+    Fields outside `fields` may be None unless an earlier call fetched them.
     """
-    return _enricher_singleton.resolve(ip)
+    return get_enricher().resolve(ip, fields)
+
+
+def resolve_many(
+    ips: Iterable[str], fields: Iterable[str] | None = None, max_workers: int = 8
+) -> dict[str, EnrichedIP]:
+    """Batch convenience wrapper: {ip: EnrichedIP} for every distinct IP."""
+    return get_enricher().resolve_many(ips, fields, max_workers)
+
+
+def clear_cache() -> None:
+    if _enricher_singleton is not None:
+        _enricher_singleton.clear_cache()
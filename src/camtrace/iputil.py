@@ -0,0 +1,117 @@
+# src/camtrace/iputil.py
+from __future__ import annotations
+
+import ipaddress
+from bisect import bisect_right
+from functools import lru_cache
+
+# Non-global IPv4 space as sorted, non-overlapping [start, end] integer ranges,
+# taken from the running interpreter's ipaddress tables so the fast path agrees
+# with `is_global` on every CPython release (the table changed in 3.11.10/3.12.4):
+# private networks minus their exceptions (e.g. 192.0.0.9), shared address
+# space (100.64/10), plus multicast (224/4, never a real remote endpoint).
+# Those tables are CPython internals; if they are ever renamed, fall back to
+# the ranges CPython 3.13 uses rather than failing at import.
+_FALLBACK_V4_RESERVED = (
+    "0.0.0.0/8",
+    "10.0.0.0/8",
+    "100.64.0.0/10",
+    "127.0.0.0/8",
+    "169.254.0.0/16",
+    "172.16.0.0/12",
+    "192.0.0.0/24",
+    "192.0.2.0/24",
+    "192.168.0.0/16",
+    "198.18.0.0/15",
+    "198.51.100.0/24",
+    "203.0.113.0/24",
+    "224.0.0.0/4",
+    "240.0.0.0/4",
+)
+_FALLBACK_V4_EXCEPTIONS = ("192.0.0.9/32", "192.0.0.10/32")
+
+
+def _v4_networks() -> tuple[list[ipaddress.IPv4Network], list[ipaddress.IPv4Network]]:
+    """(non-global networks, exceptions carved back out of them)."""
+    try:
+        c = ipaddress.IPv4Address._constants
+        nets = [*c._private_networks, c._public_network, c._multicast_network]
+        exceptions = list(getattr(c, "_private_networks_exceptions", ()))
+    except (AttributeError, TypeError):
+        nets = [ipaddress.IPv4Network(n) for n in _FALLBACK_V4_RESERVED]
+        exceptions = [ipaddress.IPv4Network(n) for n in _FALLBACK_V4_EXCEPTIONS]
+    return nets, exceptions
+
+
+def _reserved_v4() -> tuple[list[int], list[int]]:
+    nets, exceptions = _v4_networks()
+    merged: list[list[int]] = []
+    for start, end in sorted((int(n.network_address), int(n.broadcast_address)) for n in nets):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+
+    for ex in exceptions:
+        lo, hi = int(ex.network_address), int(ex.broadcast_address)
+        carved: list[list[int]] = []
+        for start, end in merged:
+            if hi < start or lo > end:
+                carved.append([start, end])
+                continue
+            if start < lo:
+                carved.append([start, lo - 1])
+            if hi < end:
+                carved.append([hi + 1, end])
+        merged = carved
+    return [s for s, _ in merged], [e for _, e in merged]
+
+
+_RESERVED_V4_START, _RESERVED_V4_END = _reserved_v4()
+
+
+def ipv4_to_int(ip: str) -> int | None:
+    """Parse a dotted-quad IPv4 string to int without ipaddress; None if not one."""
+    parts = ip.split(".")
+    if len(parts) != 4:
+        return None
+    n = 0
+    for p in parts:
+        # Same strictness as ipaddress: ASCII digits, no leading zeros
+        if not (0 < len(p) <= 3 and p.isascii() and p.isdigit()) or (len(p) > 1 and p[0] == "0"):
+            return None
+        octet = int(p)
+        if octet > 255:
+            return None
+        n = (n << 8) | octet
+    return n
+
+
+def ip_to_int(ip: str) -> tuple[int, int] | None:
+    """(version, integer value) for an IPv4/IPv6 string, or None if invalid."""
+    n = ipv4_to_int(ip)
+    if n is not None:
+        return 4, n
+    try:
+        addr = ipaddress.ip_address(ip)
+    except ValueError:
+        return None
+    return addr.version, int(addr)
+
+
+def _v4_reserved(n: int) -> bool:
+    i = bisect_right(_RESERVED_V4_START, n) - 1
+    return i >= 0 and n <= _RESERVED_V4_END[i]
+
+
+@lru_cache(maxsize=65536)
+def is_public_ip(ip: str) -> bool:
+    """True for globally routable unicast addresses; False for private/reserved/invalid."""
+    n = ipv4_to_int(ip)
+    if n is not None:
+        return not _v4_reserved(n)
+    try:
+        addr = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return addr.is_global and not addr.is_multicast
@@ -0,0 +1,208 @@
+# src/camtrace/profiling.py
+"""Per-stage wall/CPU timers for `camtrace --profile`.
+
+Disabled (the default) costs nothing: instrumented functions are only
+swapped for timing wrappers while a Profiler is enabled. Modules opt in by
+listing `PROFILE_HOOKS = (("attr.path", "stage"), ...)`; `enable()` patches
+those attributes and `disable()` puts the originals back.
+
+Stages nest: a stage's *self* time excludes time spent in stages entered
+while it was active, so the table adds up and folded stacks
+(`a;b;c <usec>`) feed straight into flamegraph.pl / speedscope.
+"""
+
+from __future__ import annotations
+
+import functools
+import importlib
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager, nullcontext
+from typing import Any, TextIO
+
+HOOK_MODULES = (
+    "camtrace.enrich_adapter",
+    "camtrace.inventory",
+    "camtrace.ip_enricher",
+)
+
+
+class StageStat:
+    __slots__ = ("calls", "wall", "cpu", "self_wall", "self_cpu")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.self_wall = 0.0
+        self.self_cpu = 0.0
+
+
+class Profiler:
+    def __init__(self, cprofile: bool = False):
+        self.stats: dict[str, StageStat] = {}
+        self.folded: dict[str, float] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._patched: list[tuple[Any, str, Any]] = []
+        self._cprofile = None
+        if cprofile:
+            import cProfile
+
+            self._cprofile = cProfile.Profile()
+        self._t0 = time.perf_counter()
+        self._c0 = time.process_time()
+        self._elapsed: tuple[float, float] | None = None
+
+    # ---- timers ----
+    def _stack(self) -> list[list[Any]]:
+        s = getattr(self._local, "stack", None)
+        if s is None:
+            s = self._local.stack = []
+        return s
+
+    def _push(self, name: str) -> None:
+        stack = self._stack()
+        path = f"{stack[-1][0]};{name}" if stack else name
+        # [path, name, wall0, cpu0, child_wall, child_cpu]
+        stack.append([path, name, time.perf_counter(), time.thread_time(), 0.0, 0.0])
+
+    def _pop(self) -> None:
+        wall_end, cpu_end = time.perf_counter(), time.thread_time()
+        stack = self._stack()
+        path, name, w0, c0, cw, cc = stack.pop()
+        wall, cpu = wall_end - w0, cpu_end - c0
+        if stack:
+            stack[-1][4] += wall
+            stack[-1][5] += cpu
+        with self._lock:
+            st = self.stats.get(name)
+            if st is None:
+                st = self.stats[name] = StageStat()
+            st.calls += 1
+            st.wall += wall
+            st.cpu += cpu
+            st.self_wall += wall - cw
+            st.self_cpu += cpu - cc
+            self.folded[path] = self.folded.get(path, 0.0) + (wall - cw)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        self._push(name)
+        try:
+            yield
+        finally:
+            self._pop()
+
+    def wrap(self, func: Callable, name: str) -> Callable:
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            self._push(name)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._pop()
+
+        return timed
+
+    def iterate(self, name: str, iterable: Iterable) -> Iterator:
+        """Time each next() on `iterable` as one call of stage `name`."""
+        it = iter(iterable)
+        while True:
+            self._push(name)
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            finally:
+                self._pop()
+            yield item
+
+    # ---- lifecycle ----
+    def _patch(self, module_name: str) -> None:
+        module = importlib.import_module(module_name)
+        for target, name in getattr(module, "PROFILE_HOOKS", ()):
+            *owners, attr = target.split(".")
+            owner = module
+            for part in owners:
+                owner = getattr(owner, part)
+            orig = owner.__dict__[attr] if isinstance(owner, type) else getattr(owner, attr)
+            self._patched.append((owner, attr, orig))
+            setattr(owner, attr, self.wrap(orig, name))
+
+    def start(self) -> None:
+        for module_name in HOOK_MODULES:
+            self._patch(module_name)
+        if self._cprofile is not None:
+            self._cprofile.enable()
+        self._t0 = time.perf_counter()
+        self._c0 = time.process_time()
+
+    def stop(self) -> None:
+        self._elapsed = (time.perf_counter() - self._t0, time.process_time() - self._c0)
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        for owner, attr, orig in reversed(self._patched):
+            setattr(owner, attr, orig)
+        self._patched.clear()
+
+    # ---- output ----
+    def report(self, fh: TextIO) -> None:
+        total_wall, total_cpu = self._elapsed or (
+            time.perf_counter() - self._t0,
+            time.process_time() - self._c0,
+        )
+        fh.write(f"\n[profile] total wall {total_wall:.3f}s  cpu {total_cpu:.3f}s\n")
+        fh.write(
+            f"{'stage':<14} {'calls':>10} {'wall_s':>9} {'self_s':>9} "
+            f"{'self_cpu_s':>10} {'self%':>6} {'us/call':>9}\n"
+        )
+        rows = sorted(self.stats.items(), key=lambda kv: kv[1].self_wall, reverse=True)
+        for name, st in rows:
+            share = 100.0 * st.self_wall / total_wall if total_wall else 0.0
+            per_call = 1e6 * st.wall / st.calls if st.calls else 0.0
+            fh.write(
+                f"{name:<14} {st.calls:>10} {st.wall:>9.3f} {st.self_wall:>9.3f} "
+                f"{st.self_cpu:>10.3f} {share:>5.1f}% {per_call:>9.1f}\n"
+            )
+
+    def write_folded(self, path: str) -> None:
+        """Collapsed stacks (self wall time in microseconds) for flamegraph tools."""
+        with open(path, "w", encoding="utf-8") as fh:
+            for stack, secs in sorted(self.folded.items()):
+                fh.write(f"{stack} {max(0, round(secs * 1e6))}\n")
+
+    def dump_cprofile(self, path: str) -> None:
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(path)
+
+
+# ---- module-level switch ----
+_active: Profiler | None = None
+
+
+def enable(cprofile: bool = False) -> Profiler:
+    global _active
+    if _active is not None:
+        return _active
+    _active = Profiler(cprofile=cprofile)
+    _active.start()
+    return _active
+
+
+def disable() -> Profiler | None:
+    global _active
+    prof, _active = _active, None
+    if prof is not None:
+        prof.stop()
+    return prof
+
+
+def active() -> Profiler | None:
+    return _active
+
+
+def stage(name: str):
+    """Context manager timing `name` when profiling, else a no-op."""
+    return _active.stage(name) if _active is not None else nullcontext()
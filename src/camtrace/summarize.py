@@ -0,0 +1,279 @@
+# src/camtrace/summarize.py
+"""`camtrace summarize`: aggregate enriched flow output at scale.
+
+Reads enriched CSV/JSONL in fixed-size row chunks, turns the columns it
+needs into NumPy arrays and folds each chunk into running group totals
+(flows / bytes / pkts by dst_as_org, dst_country_iso and device), plus the
+cross-border share. One streaming pass; memory is bounded by the chunk size
+and the number of distinct group keys, not by the number of rows.
+
+NumPy is an optional dependency: pip install 'camtrace[analytics]'.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import sys
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+try:
+    import numpy as np
+except ImportError:  # optional extra
+    np = None
+
+UNKNOWN = "(unknown)"
+GROUP_BYS = ("dst_as_org", "dst_country_iso", "device")
+# Columns read from each row; "device" is derived from src_device/src_ip
+READ_COLUMNS = ("bytes", "pkts", "dst_as_org", "dst_country_iso", "src_device", "src_ip")
+METRICS = ("flows", "bytes", "pkts")
+
+
+# ---- Chunked column readers ----
+def _chunks_from_rows(rows: Iterable[list[str]], chunk_size: int) -> Iterator[list[list[str]]]:
+    cols: list[list[str]] = [[] for _ in READ_COLUMNS]
+    n = 0
+    for row in rows:
+        for col, value in zip(cols, row, strict=True):
+            col.append(value)
+        n += 1
+        if n >= chunk_size:
+            yield cols
+            cols = [[] for _ in READ_COLUMNS]
+            n = 0
+    if n:
+        yield cols
+
+
+def _csv_rows(fh) -> Iterator[list[str]]:
+    reader = csv.reader(fh)
+    header = next(reader, None)
+    if header is None:
+        return
+    idx = [header.index(c) if c in header else None for c in READ_COLUMNS]
+    for row in reader:
+        yield [row[i] if i is not None and i < len(row) else "" for i in idx]
+
+
+def _jsonl_rows(fh) -> Iterator[list[str]]:
+    for line in fh:
+        line = line.strip()
+        if not line:
+            continue
+        rec = json.loads(line)
+        yield ["" if rec.get(c) is None else str(rec.get(c)) for c in READ_COLUMNS]
+
+
+def iter_column_chunks(
+    path: str, fmt: str = "auto", chunk_size: int = 65536
+) -> Iterator[dict[str, Any]]:
+    """Yield {column: ndarray} chunks of at most `chunk_size` rows."""
+    if fmt == "auto":
+        fmt = "csv" if path.lower().endswith(".csv") else "jsonl"
+    fh = sys.stdin if path in ("-", "") else open(path, encoding="utf-8", newline="")
+    try:
+        rows = _csv_rows(fh) if fmt == "csv" else _jsonl_rows(fh)
+        for cols in _chunks_from_rows(rows, chunk_size):
+            yield {
+                name: np.array(col, dtype=str)
+                for name, col in zip(READ_COLUMNS, cols, strict=True)
+            }
+    finally:
+        if fh is not sys.stdin:
+            fh.close()
+
+
+def _numeric(col: np.ndarray) -> np.ndarray:
+    # Blank cells (private/failed rows) count as 0; parsing stays in C
+    col = np.where(col == "", "0", col)
+    try:
+        x = col.astype(np.float64)
+    except ValueError:
+        # Slow path only for chunks with junk ("n/a", "True", ...): anything that
+        # is not a plain decimal number counts as 0 instead of aborting the pass.
+        digits = np.char.replace(np.char.lstrip(col, "+-"), ".", "", count=1)
+        x = np.where(np.char.isdigit(digits), col, "0").astype(np.float64)
+    # "nan"/"inf" parse fine but would poison the totals (and int() at the end)
+    return np.where(np.isfinite(x), x, 0.0)
+
+
+# ---- Streaming aggregation ----
+class GroupTotals:
+    """Running flows/bytes/pkts per key, updated one chunk at a time."""
+
+    def __init__(self) -> None:
+        self._ids: dict[str, int] = {}
+        self._keys: list[str] = []
+        self._sums = np.zeros((0, len(METRICS)), dtype=np.float64)
+
+    def add(self, keys: np.ndarray, values: np.ndarray) -> None:
+        """keys: (n,) str; values: (n, 3) flows/bytes/pkts."""
+        uniq, inverse = np.unique(keys, return_inverse=True)
+        ids = np.empty(len(uniq), dtype=np.intp)
+        for i, key in enumerate(uniq.tolist()):
+            gid = self._ids.get(key)
+            if gid is None:
+                gid = self._ids[key] = len(self._keys)
+                self._keys.append(key)
+            ids[i] = gid
+        if len(self._keys) > len(self._sums):
+            grown = np.zeros((len(self._keys), len(METRICS)), dtype=np.float64)
+            grown[: len(self._sums)] = self._sums
+            self._sums = grown
+        for j in range(len(METRICS)):
+            self._sums[ids, j] += np.bincount(inverse, weights=values[:, j], minlength=len(uniq))
+
+    def top(self, n: int, by: str = "bytes") -> list[dict[str, Any]]:
+        col = METRICS.index(by)
+        order = np.argsort(-self._sums[:, col], kind="stable")[:n]
+        return [
+            {"key": self._keys[i], **{m: int(self._sums[i, j]) for j, m in enumerate(METRICS)}}
+            for i in order
+        ]
+
+
+class Summary:
+    def __init__(self, home_country: str = "US"):
+        self.home_country = home_country.upper()
+        self.groups = {g: GroupTotals() for g in GROUP_BYS}
+        self.totals = np.zeros(len(METRICS), dtype=np.float64)
+        # flows / bytes with a known dst country, and the cross-border part of each
+        self.geo_known = np.zeros(2, dtype=np.float64)
+        self.cross_border = np.zeros(2, dtype=np.float64)
+
+    def add_chunk(self, cols: dict[str, np.ndarray]) -> None:
+        n = len(cols["bytes"])
+        values = np.column_stack((np.ones(n), _numeric(cols["bytes"]), _numeric(cols["pkts"])))
+        self.totals += values.sum(axis=0)
+
+        device = np.where(cols["src_device"] != "", cols["src_device"], cols["src_ip"])
+        keys = {
+            "dst_as_org": cols["dst_as_org"],
+            "dst_country_iso": np.char.upper(cols["dst_country_iso"]),
+            "device": device,
+        }
+        for name, k in keys.items():
+            self.groups[name].add(np.where(k != "", k, UNKNOWN), values)
+
+        cc = keys["dst_country_iso"]
+        known = cc != ""
+        cross = known & (cc != self.home_country)
+        self.geo_known += values[known, :2].sum(axis=0)
+        self.cross_border += values[cross, :2].sum(axis=0)
+
+    def as_dict(self, top_n: int = 10) -> dict[str, Any]:
+        share = np.divide(
+            self.cross_border,
+            self.geo_known,
+            out=np.zeros(2),
+            where=self.geo_known > 0,
+        )
+        return {
+            "totals": {m: int(v) for m, v in zip(METRICS, self.totals, strict=True)},
+            "cross_border": {
+                "home_country": self.home_country,
+                "flows": int(self.cross_border[0]),
+                "bytes": int(self.cross_border[1]),
+                "flow_share": round(float(share[0]), 4),
+                "byte_share": round(float(share[1]), 4),
+            },
+            "top": {g: t.top(top_n) for g, t in self.groups.items()},
+        }
+
+
+def summarize(
+    paths: list[str],
+    fmt: str = "auto",
+    chunk_size: int = 65536,
+    home_country: str = "US",
+) -> Summary:
+    summary = Summary(home_country)
+    for path in paths:
+        for cols in iter_column_chunks(path, fmt, chunk_size):
+            summary.add_chunk(cols)
+    return summary
+
+
+# ---- Output ----
+def write_text(result: dict[str, Any], fh) -> None:
+    t = result["totals"]
+    cb = result["cross_border"]
+    fh.write(f"Flows: {t['flows']}  Bytes: {t['bytes']}  Packets: {t['pkts']}\n")
+    fh.write(
+        f"Cross-border (dst country != {cb['home_country']}): "
+        f"{cb['flow_share']:.1%} of flows, {cb['byte_share']:.1%} of bytes "
+        f"(of flows with a known dst country)\n"
+    )
+    for group, rows in result["top"].items():
+        fh.write(f"\nTop {len(rows)} by {group} (bytes)\n")
+        width = max([len(group), *(len(r["key"]) for r in rows)])
+        fh.write(f"  {group:<{width}} {'flows':>10} {'bytes':>14} {'pkts':>10} {'bytes%':>7}\n")
+        for r in rows:
+            pct = r["bytes"] / t["bytes"] if t["bytes"] else 0.0
+            fh.write(
+                f"  {r['key']:<{width}} {r['flows']:>10} {r['bytes']:>14} "
+                f"{r['pkts']:>10} {pct:>7.1%}\n"
+            )
+
+
+# ----------------- CLI -----------------
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(
+        prog="camtrace summarize",
+        description="Summarize enriched CamTrace output (CSV/JSONL) by org, country and device.",
+    )
+    p.add_argument(
+        "--in",
+        dest="infile",
+        action="append",
+        default=None,
+        help="Enriched CSV/JSONL (default: stdin). Repeat for several files.",
+    )
+    p.add_argument(
+        "--format",
+        choices=("auto", "csv", "jsonl"),
+        default="auto",
+        help="Input format (default: by file extension, .csv else JSONL)",
+    )
+    p.add_argument("--top", type=int, default=10, help="Rows per group (default: 10)")
+    p.add_argument(
+        "--home-country",
+        default=os.getenv("CAMTRACE_HOME_COUNTRY", "US"),
+        help="ISO code treated as domestic for the cross-border share (default: US)",
+    )
+    p.add_argument(
+        "--chunk-size",
+        type=int,
+        default=65536,
+        help="Rows per NumPy chunk; bounds memory (default: 65536)",
+    )
+    p.add_argument("--json", action="store_true", help="Emit JSON instead of tables")
+    args = p.parse_args(argv)
+    args.infile = args.infile or ["-"]
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if np is None:
+        print(
+            "camtrace summarize requires numpy: pip install 'camtrace[analytics]'",
+            file=sys.stderr,
+        )
+        return 2
+
+    result = summarize(args.infile, args.format, args.chunk_size, args.home_country)
+    result = result.as_dict(args.top)
+    if args.json:
+        json.dump(result, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        write_text(result, sys.stdout)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,36 @@
+# tests/conftest.py
+import time
+
+import pytest
+
+from camtrace import ip_enricher
+from camtrace.ip_enricher import IPEnricher
+
+
+class CountingEnricher(IPEnricher):
+    """IPEnricher without MaxMind/DNS backends: canned ASN/PTR answers, records each lookup."""
+
+    def __init__(self, delay: float = 0.0):
+        super().__init__(asn_db_path="", city_db_path="")
+        self.calls = []
+        self.delay = delay
+
+    def lookup(self, ip, sources):
+        self.calls.append((ip, set(sources)))
+        time.sleep(self.delay)
+        out = super().lookup(ip, set(sources) - {"ptr"})  # no readers: None, unstamped
+        if "asn" in sources:
+            out.update(asn=64500, as_org="EXAMPLE")
+            out["enrich_meta"]["asn"] = self.build_epochs["asn"]
+        if "ptr" in sources:
+            out["ptr"] = f"host-{ip}.example"
+            out["enrich_meta"]["ptr"] = int(time.time())
+        return out
+
+
+@pytest.fixture
+def fake_enricher(monkeypatch):
+    """A fresh CountingEnricher installed as the process-wide enricher."""
+    e = CountingEnricher()
+    monkeypatch.setattr(ip_enricher, "_enricher_singleton", e)
+    return e
@@ -0,0 +1,62 @@
+# tests/test_cli.py
+import csv
+import json
+
+import pytest
+
+from camtrace.cli import parse_args, run
+from camtrace.enrich_adapter import parse_meta
+
+
+def test_follow_to_file_requires_checkpoint(tmp_path, monkeypatch):
+    monkeypatch.delenv("CAMTRACE_CHECKPOINT", raising=False)
+    src = str(tmp_path / "in.jsonl")
+    out = str(tmp_path / "out.jsonl")
+
+    with pytest.raises(SystemExit):
+        parse_args(["--follow", "--in", src, "--out", out])
+
+    args = parse_args(["--follow", "--in", src, "--out", out, "--checkpoint", out + ".ckpt"])
+    assert args.follow and args.checkpoint
+
+
+def test_reenrich_flags_require_enrich(monkeypatch):
+    monkeypatch.delenv("ENRICH_IPS", raising=False)
+    for flag in ("--skip-enriched", "--refresh-stale"):
+        with pytest.raises(SystemExit):
+            parse_args([flag])
+        assert parse_args(["--enrich", flag]).enrich
+
+
+def test_fields_rejects_unknown_columns(capsys):
+    assert parse_args(["--fields", "dst_ip,dst_asn"]).fields == ["dst_ip", "dst_asn"]
+
+    with pytest.raises(SystemExit):
+        parse_args(["--fields", "dst_asn,dst_org"])
+    err = capsys.readouterr().err
+    assert "dst_org" in err and "dst_as_org" in err
+
+
+def test_enrich_output_keeps_meta_for_skip_enriched(tmp_path, fake_enricher):
+    e = fake_enricher
+    src = tmp_path / "flows.jsonl"
+    src.write_text('{"src_ip":"192.168.1.10","dst_ip":"8.8.8.8"}\n', encoding="utf-8")
+
+    out_csv = tmp_path / "out.csv"
+    run(parse_args(["--enrich", "--in", str(src), "--csv", "--out", str(out_csv)]))
+    with open(out_csv, encoding="utf-8", newline="") as fh:
+        row = next(csv.DictReader(fh))
+    assert set(parse_meta(row["dst_enrich_meta"])) == {"asn", "ptr"}
+
+    out_jsonl = tmp_path / "out.jsonl"
+    argv = ["--enrich", "--fields", "dst_ip,dst_asn", "--in", str(src), "--out", str(out_jsonl)]
+    run(parse_args(argv))
+    rec = json.loads(out_jsonl.read_text(encoding="utf-8"))
+    assert set(rec) == {"dst_ip", "dst_asn", "dst_enrich_meta"}
+
+    e.clear_cache()
+    before = len(e.calls)
+    argv = ["--enrich", "--skip-enriched", "--fields", "dst_ip,dst_asn",
+            "--in", str(out_jsonl), "--out", str(tmp_path / "again.jsonl")]
+    run(parse_args(argv))
+    assert len(e.calls) == before
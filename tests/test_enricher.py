@@ -1,7 +1,143 @@
-from camtrace.ip_enricher import resolve_ip
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from camtrace import enrich_adapter
+from camtrace.enrich_adapter import RefreshPolicy, enrich_flow_batch, enrich_flow_record
+from camtrace.ip_enricher import IPEnricher, resolve_ip
 
 
 def test_google_asn():
     r = resolve_ip("8.8.8.8")
     assert r.asn in (15169,)  # Google ASN
     assert r.as_org and "GOOGLE" in r.as_org.upper()
+
+
+def test_resolve_runs_only_missing_sources(fake_enricher):
+    e = fake_enricher
+
+    r = e.resolve("192.0.2.1", ["asn"])
+    assert (r.asn, r.ptr) == (64500, None)
+    r = e.resolve("192.0.2.1", ["asn", "ptr"])
+    assert (r.asn, r.ptr) == (64500, "host-192.0.2.1.example")
+    e.resolve("192.0.2.1", ["as_org", "ptr"])
+    assert e.calls == [("192.0.2.1", {"asn"}), ("192.0.2.1", {"ptr"})]
+
+
+def test_concurrent_misses_share_one_lookup(fake_enricher):
+    e = fake_enricher
+    e.delay = 0.2
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: e.resolve("192.0.2.7", ["ptr"]), range(8)))
+
+    assert len(e.calls) == 1
+    assert {r.ptr for r in results} == {"host-192.0.2.7.example"}
+
+
+def test_resolve_many_dedupes_and_uses_cache(fake_enricher):
+    e = fake_enricher
+    e.resolve("192.0.2.1", ["asn"])
+
+    out = e.resolve_many(["192.0.2.1", "192.0.2.2", "192.0.2.2"], ["asn"])
+    assert set(out) == {"192.0.2.1", "192.0.2.2"}
+    assert [ip for ip, _ in e.calls] == ["192.0.2.1", "192.0.2.2"]
+
+
+def test_flow_batch_resolves_distinct_ips_concurrently(fake_enricher):
+    e = fake_enricher
+    e.delay = 0.3
+    flows = [
+        {"src_ip": "192.168.1.10", "dst_ip": f"9.9.9.{i % 4}"} for i in range(8)
+    ]
+
+    t0 = time.monotonic()
+    enrich_flow_batch(flows, fields=["dst_ip", "dst_ptr"])
+    assert time.monotonic() - t0 < 0.9  # 4 lookups overlapped, not 4 x 0.3s
+    assert sorted(ip for ip, _ in e.calls) == [f"9.9.9.{i}" for i in range(4)]
+    assert flows[5]["dst_ptr"] == "host-9.9.9.1.example"
+
+
+def test_reenrich_skips_stamped_and_refreshes_stale(fake_enricher):
+    e = fake_enricher
+    fields = ["dst_asn", "dst_ptr"]
+
+    rec = enrich_flow_record({"dst_ip": "8.8.8.8"}, fields=fields)
+    meta = enrich_adapter.parse_meta(rec["dst_enrich_meta"])
+    assert set(meta) == {"asn", "ptr"}
+
+    e.clear_cache()
+    enrich_flow_record(rec, fields=fields, policy=RefreshPolicy())
+    assert len(e.calls) == 1  # everything already stamped
+
+    # New ASN build loaded: only the ASN source is stale
+    e.build_epochs = {"asn": 1760000000, "city": 0}
+    enrich_flow_record(rec, fields=fields, policy=RefreshPolicy(refresh_stale=True))
+    assert e.calls[-1] == ("8.8.8.8", {"asn"})
+    assert enrich_adapter.parse_meta(rec["dst_enrich_meta"])["asn"] == 1760000000
+
+
+def test_reenrich_fills_columns_an_earlier_projection_dropped(fake_enricher):
+    e = fake_enricher
+
+    rec = enrich_flow_record({"dst_ip": "8.8.8.8"}, fields=["dst_ip", "dst_asn"])
+    rec = {k: rec[k] for k in ("dst_ip", "dst_asn", "dst_enrich_meta")}  # projected output
+    e.clear_cache()
+
+    enrich_flow_record(rec, fields=["dst_ip", "dst_as_org"], policy=RefreshPolicy())
+    assert rec["dst_as_org"] == "EXAMPLE"
+    assert e.calls[-1] == ("8.8.8.8", {"asn"})
+
+    before = len(e.calls)
+    enrich_flow_record(rec, fields=["dst_ip", "dst_asn", "dst_as_org"], policy=RefreshPolicy())
+    assert len(e.calls) == before
+
+
+def test_failed_joined_lookup_does_not_strand_own_claims(fake_enricher):
+    release = threading.Event()
+    e = fake_enricher
+    canned = e.lookup
+
+    def flaky_asn(ip, sources):
+        if "asn" in sources:
+            e.calls.append((ip, {"asn"}))
+            release.wait(5)
+            raise RuntimeError("asn reader failed")
+        return canned(ip, sources)
+
+    e.lookup = flaky_asn
+    errors = []
+
+    def call(fields):
+        try:
+            e.resolve("1.1.1.1", fields)
+        except RuntimeError as exc:
+            errors.append(exc)
+
+    a = threading.Thread(target=call, args=(["asn"],))
+    a.start()
+    while ("1.1.1.1", "asn") not in e._inflight:
+        time.sleep(0.01)
+    b = threading.Thread(target=call, args=(["asn", "ptr"],))  # claims ptr, joins asn
+    b.start()
+    while ("1.1.1.1", {"ptr"}) not in e.calls:
+        time.sleep(0.01)
+    release.set()
+    a.join(5)
+    b.join(5)
+
+    assert len(errors) == 2
+    assert e._inflight == {}
+    assert e.resolve("1.1.1.1", ["ptr"]).ptr == "host-1.1.1.1.example"
+
+
+def test_reader_errors_are_not_stamped():
+    class BrokenReader:
+        def asn(self, ip):
+            raise ValueError("corrupt database")
+
+    e = IPEnricher(asn_db_path="", city_db_path="")
+    e._asn_reader = BrokenReader()
+
+    out = e.lookup("8.8.8.8", {"asn", "city"})
+    assert out["asn"] is None
+    assert out["enrich_meta"] == {}  # broken ASN reader, no City DB configured
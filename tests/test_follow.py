@@ -0,0 +1,87 @@
+# tests/test_follow.py
+import json
+import os
+import threading
+
+from camtrace.follow import FileTailer, FollowReader
+
+
+def _append(path, *recs, tail=""):
+    with open(path, "a", encoding="utf-8") as fh:
+        for r in recs:
+            fh.write(json.dumps(r) + "\n")
+        fh.write(tail)
+
+
+def test_tailer_buffers_partial_lines_and_handles_truncation(tmp_path):
+    path = tmp_path / "flows.jsonl"
+    _append(path, {"n": 1}, tail='{"n": 2')
+    t = FileTailer(path)
+
+    lines = t.poll()
+    assert [json.loads(line) for line, _, _ in lines] == [{"n": 1}]
+    assert t.offset == path.stat().st_size - len('{"n": 2')
+
+    _append(path, tail="}\n")
+    assert [json.loads(line) for line, _, _ in t.poll()] == [{"n": 2}]
+
+    path.write_text('{"n": 3}\n', encoding="utf-8")  # truncate + rewrite
+    assert [json.loads(line) for line, _, _ in t.poll()] == [{"n": 3}]
+    t.close()
+
+
+def test_tailer_follows_rotation(tmp_path):
+    path = tmp_path / "flows.jsonl"
+    _append(path, {"n": 1})
+    t = FileTailer(path)
+    assert len(t.poll()) == 1
+
+    _append(path, {"n": 2})
+    os.rename(path, tmp_path / "flows.jsonl.1")
+    _append(path, {"n": 3})
+
+    got = []
+    for _ in range(3):
+        got += [json.loads(line)["n"] for line, _, _ in t.poll()]
+    assert got == [2, 3]
+    t.close()
+
+
+def test_follow_reader_resumes_from_checkpoint(tmp_path):
+    path = tmp_path / "flows.jsonl"
+    ckpt = tmp_path / "ckpt.json"
+    _append(path, {"n": 1}, {"n": 2})
+
+    reader = FollowReader([path], checkpoint_path=ckpt, poll_interval=0.01)
+    batch = next(reader.batches(batch_size=2))
+    assert [r["n"] for r in batch] == [1, 2]
+    reader.commit()
+    reader.close()
+
+    _append(path, {"n": 3})
+    reader = FollowReader([path], checkpoint_path=ckpt, poll_interval=0.01)
+    batch = next(reader.batches(batch_size=10, flush_interval=0.0))
+    assert [r["n"] for r in batch] == [3]
+    reader.close()
+
+
+def test_follow_reader_drains_file_rotated_while_stopped(tmp_path):
+    path = tmp_path / "flows.jsonl"
+    ckpt = tmp_path / "ckpt.json"
+    _append(path, {"n": 1})
+
+    reader = FollowReader([path], checkpoint_path=ckpt, poll_interval=0.01)
+    assert [r["n"] for r in next(reader.batches(batch_size=1))] == [1]
+    reader.commit()
+    reader.close()
+
+    _append(path, {"n": 2})  # unread tail of the file about to be rotated
+    os.rename(path, tmp_path / "flows.jsonl.1")
+    _append(path, {"n": 3})
+
+    reader = FollowReader([path], checkpoint_path=ckpt, poll_interval=0.01)
+    stop = threading.Event()
+    threading.Timer(0.2, stop.set).start()
+    got = [r["n"] for batch in reader.batches(flush_interval=0.0, stop=stop) for r in batch]
+    assert got == [2, 3]
+    reader.close()
@@ -0,0 +1,65 @@
+# tests/test_inventory.py
+import ipaddress
+
+from camtrace import iputil
+from camtrace.inventory import DeviceInfo, DeviceInventory
+from camtrace.iputil import ipv4_to_int, is_public_ip
+
+
+def test_is_public_ip_matches_ipaddress_outside_multicast():
+    for ip in ["8.8.8.8", "10.1.2.3", "100.64.0.1", "172.31.255.255", "192.0.2.7",
+               "192.0.0.9", "192.0.0.20", "203.0.113.1", "255.255.255.255",
+               "2001:4860:4860::8888", "fe80::1", "::1"]:
+        assert is_public_ip(ip) == ipaddress.ip_address(ip).is_global, ip
+    assert not is_public_ip("239.255.255.250")  # SSDP multicast
+    assert not is_public_ip("not-an-ip")
+    assert ipv4_to_int("010.0.0.1") is None
+    assert ipv4_to_int("1.2.3.4") == 0x01020304
+
+
+def test_reserved_v4_table_matches_ipaddress_at_every_boundary():
+    nets, exceptions = iputil._v4_networks()
+    edges = {*iputil._RESERVED_V4_START, *iputil._RESERVED_V4_END}
+    edges |= {int(n.network_address) for n in nets + exceptions}
+    edges |= {int(n.broadcast_address) for n in nets + exceptions}
+    for n in {e + d for e in edges for d in (-1, 0, 1)} - {-1, 1 << 32}:
+        addr = ipaddress.IPv4Address(n)
+        expected = addr.is_global and not addr.is_multicast
+        assert is_public_ip(str(addr)) == expected, addr
+
+
+def test_reserved_v4_falls_back_without_interpreter_tables(monkeypatch):
+    monkeypatch.setattr(ipaddress.IPv4Address, "_constants", object())
+    starts, ends = iputil._reserved_v4()
+    assert len(starts) == len(ends)
+    table = list(zip(starts, ends, strict=True))
+
+    def reserved(ip):
+        n = ipv4_to_int(ip)
+        return any(s <= n <= e for s, e in table)
+
+    assert reserved("10.1.2.3") and reserved("224.0.0.1") and reserved("192.0.0.8")
+    assert not reserved("8.8.8.8") and not reserved("192.0.0.9")
+
+
+def test_inventory_longest_prefix_wins(tmp_path):
+    path = tmp_path / "inventory.csv"
+    path.write_text(
+        "cidr,device,site,owner\n"
+        "192.168.0.0/16,,home,ty\n"
+        "192.168.1.0/24,,garage,ty\n"
+        "192.168.1.10,front-door-cam,garage,ty\n"
+        "fd00::/8,v6-lan,home,\n",
+        encoding="utf-8",
+    )
+    inv = DeviceInventory.from_csv(path)
+
+    assert inv.lookup("192.168.1.10") == DeviceInfo("front-door-cam", "garage", "ty")
+    assert inv.lookup("192.168.1.11") == DeviceInfo(None, "garage", "ty")
+    assert inv.lookup("192.168.2.1") == DeviceInfo(None, "home", "ty")
+    assert inv.lookup("192.169.0.1") is None
+    assert inv.lookup("fd12::1") == DeviceInfo("v6-lan", "home", None)
+
+    rec = {}
+    inv.label("src_", "192.168.1.10", rec)
+    assert rec == {"src_device": "front-door-cam", "src_site": "garage", "src_owner": "ty"}
@@ -0,0 +1,33 @@
+# tests/test_profiling.py
+import io
+
+from camtrace import enrich_adapter, profiling
+
+
+def test_profiler_patches_hooks_only_while_enabled():
+    orig = enrich_adapter._is_public
+    prof = profiling.enable()
+    try:
+        assert enrich_adapter._is_public is not orig
+        enrich_adapter.enrich_flow_record({"src_ip": "10.0.0.1"}, fields=["src_asn"])
+    finally:
+        profiling.disable()
+
+    assert enrich_adapter._is_public is orig
+    assert prof.stats["classify"].calls == 1
+
+
+def test_nested_stages_report_self_time():
+    prof = profiling.Profiler()
+    with prof.stage("outer"):
+        for _ in prof.iterate("inner", range(3)):
+            pass
+
+    assert prof.stats["inner"].calls == 4  # 3 items + exhaustion
+    outer = prof.stats["outer"]
+    assert outer.self_wall <= outer.wall
+    assert set(prof.folded) == {"outer", "outer;inner"}
+
+    out = io.StringIO()
+    prof.report(out)
+    assert "outer" in out.getvalue()
@@ -0,0 +1,59 @@
+# tests/test_summarize.py
+import json
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from camtrace.summarize import summarize  # noqa: E402
+
+
+def test_summarize_groups_across_chunks(tmp_path):
+    path = tmp_path / "enriched.jsonl"
+    rows = [
+        {"src_ip": "192.168.1.10", "src_device": "cam", "bytes": 100, "pkts": 2,
+         "dst_as_org": "GOOGLE", "dst_country_iso": "US"},
+        {"src_ip": "192.168.1.10", "src_device": "cam", "bytes": 300, "pkts": 3,
+         "dst_as_org": "EXAMPLE", "dst_country_iso": "DE"},
+        {"src_ip": "192.168.1.11", "bytes": 50, "pkts": 1,
+         "dst_as_org": "GOOGLE", "dst_country_iso": None},
+    ]
+    path.write_text("".join(json.dumps(r) + "\n" for r in rows), encoding="utf-8")
+
+    result = summarize([str(path)], chunk_size=2, home_country="us").as_dict(top_n=5)
+
+    assert result["totals"] == {"flows": 3, "bytes": 450, "pkts": 6}
+    assert result["cross_border"]["flows"] == 1
+    assert result["cross_border"]["byte_share"] == 0.75
+    orgs = {r["key"]: r["bytes"] for r in result["top"]["dst_as_org"]}
+    assert orgs == {"GOOGLE": 150, "EXAMPLE": 300}
+    assert [r["key"] for r in result["top"]["device"]] == ["cam", "192.168.1.11"]
+
+
+def test_summarize_treats_non_numeric_cells_as_zero(tmp_path):
+    path = tmp_path / "enriched.csv"
+    path.write_text(
+        "src_ip,bytes,pkts,dst_as_org\n"
+        "192.168.1.10,n/a,True,GOOGLE\n"
+        "192.168.1.10,120,-1.5,GOOGLE\n",
+        encoding="utf-8",
+    )
+
+    result = summarize([str(path)]).as_dict()
+
+    assert result["totals"]["flows"] == 2
+    assert result["totals"]["bytes"] == 120
+
+
+def test_summarize_treats_nan_and_inf_cells_as_zero(tmp_path):
+    path = tmp_path / "enriched.jsonl"
+    path.write_text(
+        '{"bytes": NaN, "pkts": Infinity}\n'
+        '{"bytes": "-inf", "pkts": 1}\n'
+        '{"bytes": 40, "pkts": 2}\n',
+        encoding="utf-8",
+    )
+
+    result = summarize([str(path)]).as_dict()
+
+    assert result["totals"] == {"flows": 3, "bytes": 40, "pkts": 3}